@@ -13,6 +13,9 @@ import glob
 import pyfiglet
 from scipy.optimize import newton
 from uniplot import plot
+from Autogasuptake.pyramid import write_pyramid
+from Autogasuptake.uptake_rate import savgol_uptake, uniform_grid
+from Autogasuptake.tdms import load_tdms
 
 # Print the title
 os.system('cls' if os.name == 'nt' else 'clear')
@@ -29,6 +32,11 @@ print('------------------------------------------------')
 
 def main():
     # Read the settings from `settings.txt` file
+    # Optional settings (the default values are used if they are not in the file)
+    sg_window = 11
+    sg_order = 2
+    pressure_channel = None
+    volume_channel = None
     try:
         with open('settings.txt', 'r') as f:
             lines = f.readlines()
@@ -65,6 +73,14 @@ def main():
                         water_mass = float(line[1].strip())
                     elif line[0].strip() == 'clathrate-type':
                         clath_type = line[1].strip()
+                    elif line[0].strip() == 'smoothing-window':
+                        sg_window = int(line[1].strip())
+                    elif line[0].strip() == 'smoothing-order':
+                        sg_order = int(line[1].strip())
+                    elif line[0].strip() == 'pressure-channel':
+                        pressure_channel = line[1].strip()
+                    elif line[0].strip() == 'volume-channel':
+                        volume_channel = line[1].strip()
 
         # Check the validity of the settings
         if not os.path.isdir(input_dirloc):
@@ -100,6 +116,12 @@ def main():
         if water_mass <= 0:
             print('ERROR The mass of water must be positive.')
             sys.exit()
+        if sg_window <= 0 or sg_window % 2 == 0:
+            print('ERROR The smoothing window must be a positive odd number.')
+            sys.exit()
+        if sg_order < 0 or sg_order >= sg_window:
+            print('ERROR The smoothing order must be between 0 and the smoothing window - 1.')
+            sys.exit()
 
     except FileNotFoundError:
         print('ERROR There is no `settings.txt` file in the current directory. I will make a new `settings.txt` file for you.')
@@ -155,6 +177,16 @@ def main():
             f.write("# Type of the clathrate (options: sI, sII, sH, SCS-I, TS–I, HS-I, and none) \n")
             f.write("clathrate-type = sI \n")
             f.write("\n")
+            f.write("# Savitzky-Golay smoothing window for the gas uptake rate (odd number of data points) \n")
+            f.write("smoothing-window = 11 \n")
+            f.write("\n")
+            f.write("# Savitzky-Golay polynomial order (smaller than the smoothing window) \n")
+            f.write("smoothing-order = 2 \n")
+            f.write("\n")
+            f.write("# Channel names of the pressure (psi) and the cylinder volume (mL) in TDMS files (only for TDMS files; remove `#` to use) \n")
+            f.write("# pressure-channel = Pressure \n")
+            f.write("# volume-channel = Volume \n")
+            f.write("\n")
         print('INFO The `settings.txt` file has been created. Please edit the file and run the program again.')
         sys.exit()
 
@@ -182,6 +214,10 @@ def main():
     print('* Water mass: ', water_mass, 'g')
     print('* Water mol number: ', cal_water_mol, 'mol')
     print('* Type of the clathrate: ', clath_type)
+    print('* Smoothing window: ', sg_window, 'data points')
+    print('* Smoothing order: ', sg_order)
+    print('* TDMS pressure channel: ', pressure_channel if pressure_channel is not None else 'auto')
+    print('* TDMS volume channel: ', volume_channel if volume_channel is not None else 'auto')
 
     print('---------------------------------------------------------')
     print('INFO If these options are not correct, please adjust them in the `settings.txt` file.')
@@ -249,7 +285,9 @@ def main():
     ###############EOS FUNCTIONS################
 
     # Show the list of files in the selected directory:
-    file_list = glob.glob(input_dirloc + '*.csv')
+    file_list = glob.glob(input_dirloc + '*.csv') + glob.glob(input_dirloc + '*.tdms')
+    # The output files of the previous runs are not raw data files
+    file_list = [file for file in file_list if not file.endswith(('_OUTDATA.csv', '_SUMMARY.csv'))]
     file_list.sort()
     try:
         if len(file_list) == 0:
@@ -257,7 +295,7 @@ def main():
         else:
             pass
     except:
-        print("\nINFO There is no csv file in your directory. Please check the directory location.")
+        print("\nINFO There is no csv or tdms file in your directory. Please check the directory location.")
         print("INFO The program will stop.")
         exit()
 
@@ -274,9 +312,23 @@ def main():
         print("ERROR Your input number is out of range. Please check the file number again.")
         print("ERROR The program will stop.")
         exit()
+    # Output files are named after the raw data file (e.g. `Raw1.csv` -> `Raw1_OUTDATA.csv`)
+    file_stem = os.path.splitext(str(file_list[file_number]))[0]
 
-    # Checking data type whether it is object or not. If it is float64, the delimiter is ','. If it is object, the delimiter is ' '.
-    if pd.read_csv(file_list[file_number], header=None, names=['Pressure (psi)', 'Cylinder volume (mL)']).dtypes[0] == 'float64':
+    # TDMS files: the raw channel data is memory-mapped directly (no text export needed)
+    if file_list[file_number].endswith('.tdms'):
+        try:
+            df, tdms_freq = load_tdms(file_list[file_number], pressure_channel, volume_channel)
+        except ValueError as e:
+            print("ERROR", e)
+            print("ERROR The program will stop.")
+            exit()
+        if tdms_freq is not None:
+            data_freq = tdms_freq
+            print("INFO The sample interval stored in the TDMS file (", data_freq, "ms ) is used instead of the `frequency` setting.")
+
+    # CSV files: checking data type whether it is object or not. If it is float64, the delimiter is ','. If it is object, the delimiter is ' '.
+    elif pd.read_csv(file_list[file_number], header=None, names=['Pressure (psi)', 'Cylinder volume (mL)']).dtypes[0] == 'float64':
         df = pd.read_csv(file_list[file_number], header=None, sep=',', names=['Pressure (psi)', 'Cylinder volume (mL)'])
     elif pd.read_csv(file_list[file_number], header=None, names=['Pressure (psi)', 'Cylinder volume (mL)']).dtypes[0] == 'object':
         df = pd.read_csv(file_list[file_number], header=None, sep=' ', names=['Pressure (psi)', 'Cylinder volume (mL)'])
@@ -321,13 +373,13 @@ def main():
 
     # Make a new time column here
     if tunit == 'h':
-        time = np.arange(0, data_num * data_freq, data_freq) / 3600000
+        time = np.arange(data_num) * data_freq / 3600000
         df['Time (h)'] = time
     elif tunit == 'm':
-        time = np.arange(0, data_num * data_freq, data_freq) / 60000
+        time = np.arange(data_num) * data_freq / 60000
         df['Time (min)'] = time
     elif tunit == 's':
-        time = np.arange(0, data_num * data_freq, data_freq) / 1000
+        time = np.arange(data_num) * data_freq / 1000
         df['Time (s)'] = time
 
     # 2. y-axis: gas uptake (mol of gas / mol of water) -> delta_n
@@ -363,6 +415,33 @@ def main():
     df['Gas uptake (mol of gas)'] = df['Pressure (bar)'] * df['Delta_V (L)'] / (R * exp_temp * z)
     df['Gas uptake (mol of gas / mol of water)'] = df['Gas uptake (mol of gas)'] / cal_water_mol
     print("INFO The data was successfully treated!")
+
+    # 4. Smoothed gas uptake & gas uptake rate (d n / d t) with the Savitzky-Golay filter
+        # The filter runs on the uniform `frequency` grid; the window is shortened if the data is shorter than the window.
+        # The rows removed in step 3 leave gaps in the time axis. These samples are interpolated back only for the filter (the exported rows are not changed).
+    time_name = {'h': 'Time (h)', 'm': 'Time (min)', 's': 'Time (s)'}[tunit]
+    rate_name = {'h': 'Gas uptake rate (mol of gas / mol of water / h)', 'm': 'Gas uptake rate (mol of gas / mol of water / min)', 's': 'Gas uptake rate (mol of gas / mol of water / s)'}[tunit]
+    time_step = {'h': data_freq / 3600000, 'm': data_freq / 60000, 's': data_freq / 1000}[tunit]
+    grid_uptake, grid_index = uniform_grid(df[time_name].to_numpy(), df['Gas uptake (mol of gas / mol of water)'].to_numpy(), time_step)
+    if len(grid_uptake) > len(df):
+        print("INFO", len(grid_uptake) - len(df), "removed data point(s) were interpolated on the uniform time grid for the smoothing filter.")
+    sg_window_used = min(sg_window, len(grid_uptake) if len(grid_uptake) % 2 == 1 else len(grid_uptake) - 1)
+    if sg_window_used <= sg_order:
+        print("INFO The data is too short for the smoothing window. The gas uptake rate will not be calculated.")
+        max_rate = None
+    else:
+        if sg_window_used < sg_window:
+            print("INFO The data is shorter than the smoothing window. The smoothing window was reduced to", sg_window_used, "data points.")
+        smoothed, rate = savgol_uptake(grid_uptake, time_step, sg_window_used, sg_order)
+        smoothed, rate = smoothed[grid_index], rate[grid_index]
+        df['Smoothed gas uptake (mol of gas / mol of water)'] = smoothed
+        df[rate_name] = rate
+        max_rate = float(rate.max())
+        max_rate_time = float(df[time_name].iloc[int(rate.argmax())])
+        print("INFO The maximum gas uptake rate is", max_rate, rate_name.split('(')[1].rstrip(')'), "at", max_rate_time, time_name.split('(')[1].rstrip(')'))
+
+    # Keep the full-resolution data for the pyramid; `df` may be thinned out for the scatter plot below
+    df_processed = df
     ###############CALCULATION################
 
     ###############GRAPH PLOTTER################
@@ -566,11 +645,11 @@ def main():
 
         # Save figure
         if output_file_type == 'png':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.png'), dpi=300, bbox_inches='tight')
+            plt.savefig(file_stem + '.png', dpi=300, bbox_inches='tight')
         elif output_file_type == 'pdf':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.pdf'), bbox_inches='tight')
+            plt.savefig(file_stem + '.pdf', bbox_inches='tight')
         elif output_file_type == 'svg':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.svg'), bbox_inches='tight')
+            plt.savefig(file_stem + '.svg', bbox_inches='tight')
         else:
             print('ERROR Incorrect input. Please enter "png", "pdf", or "svg".')
             sys.exit()
@@ -651,11 +730,11 @@ def main():
 
         # Save figure
         if output_file_type == 'png':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.png'), dpi=300, bbox_inches='tight')
+            plt.savefig(file_stem + '.png', dpi=300, bbox_inches='tight')
         elif output_file_type == 'pdf':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.pdf'), bbox_inches='tight')
+            plt.savefig(file_stem + '.pdf', bbox_inches='tight')
         elif output_file_type == 'svg':
-            plt.savefig(str(file_list[file_number]).replace('.csv', '.svg'), bbox_inches='tight')
+            plt.savefig(file_stem + '.svg', bbox_inches='tight')
         else:
             print('ERROR Incorrect input. Please enter "png", "pdf", or "svg".')
             sys.exit()
@@ -671,11 +750,29 @@ def main():
     # Export gas uptake data & miscellaneous info. into a new csv file in the target folder
     def data_exporter():
         # Create a new csv file
-        df.to_csv(str(file_list[file_number]).replace('.csv', '_OUTDATA.csv'), header=True, index=True)
+        df.to_csv(file_stem + '_OUTDATA.csv', header=True, index=True)
         print("INFO The gas uptake data was successfully exported! Please check the target folder.")
 
+    # Export the maximum gas uptake rate and its time into a summary csv file
+    def rate_exporter():
+        summary = pd.DataFrame({'Maximum ' + rate_name[0].lower() + rate_name[1:]: [max_rate], 'Time of maximum rate ' + time_name.split(' ', 1)[1]: [max_rate_time]})
+        summary.to_csv(file_stem + '_SUMMARY.csv', header=True, index=False)
+        print("INFO The maximum gas uptake rate was successfully exported! Please check the target folder.")
+
+    # Store the multi-resolution pyramid of the gas uptake & pressure for quick re-plotting at any zoom level
+    def pyramid_exporter():
+        columns = {'Gas uptake (mol of gas / mol of water)': df_processed['Gas uptake (mol of gas / mol of water)'],
+                   'Pressure (bar)': df_processed['Pressure (bar)']}
+        if max_rate is not None:
+            columns[rate_name] = df_processed[rate_name]
+        write_pyramid(file_stem + '_PYRAMID.bin', time_name, df_processed[time_name], columns)
+        print("INFO The multi-resolution pyramid was successfully exported! Please check the target folder.")
+
     # Execute
     data_exporter()
+    if max_rate is not None:
+        rate_exporter()
+    pyramid_exporter()
     ###############DATA EXPORTER################
 
 if __name__ == "__main__":
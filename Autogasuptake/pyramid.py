@@ -0,0 +1,123 @@
+import json
+import numpy as np
+import pandas as pd
+
+# Multi-resolution (downsampled) pyramid of the processed series, stored next to the `_OUTDATA.csv` file.
+# Level 0 holds the full-resolution data. Each following level merges `factor` neighbouring buckets into one (mean, min, max).
+# File layout: magic | header length (uint32) | JSON header | one float64 block per level.
+# The level 0 block has the rows [time, value_1, value_2, ...] and one column per data point.
+# The other blocks have the rows [time, mean_1, min_1, max_1, mean_2, min_2, max_2, ...] and one column per bucket.
+PYRAMID_MAGIC = b'AGUPYR01'
+
+def build_pyramid(time, columns, factor=4, min_points=16):
+    """
+    Build the levels of the pyramid.
+    :param time: 1D array of the time values (ascending)
+    :param columns: dict of column name -> 1D array with the same length as `time`
+    :param factor: reduction factor between two consecutive levels
+    :param min_points: the coarsest level holds at most this many buckets
+    :return: list of 2D float64 arrays (finest level first; see the block layout above)
+    """
+    if factor < 2:
+        raise ValueError('The pyramid reduction factor must be at least 2.')
+    n_columns = len(columns)
+    levels = [np.vstack([np.asarray(time, dtype=np.float64)] + [np.asarray(values, dtype=np.float64) for values in columns.values()])]
+
+    # Number of raw data points in each bucket; keeps the means exact when the last bucket is not full
+    weights = np.ones(levels[0].shape[1])
+    while levels[-1].shape[1] > min_points:
+        prev = levels[-1]
+        starts = np.arange(0, prev.shape[1], factor)
+        new_weights = np.add.reduceat(weights, starts)
+        block = np.empty((1 + 3 * n_columns, len(starts)))
+        block[0] = np.add.reduceat(prev[0] * weights, starts) / new_weights
+        for i in range(n_columns):
+            if len(levels) == 1:
+                mean = low = high = prev[1 + i] # level 0: one row per column
+            else:
+                mean, low, high = prev[1 + 3*i], prev[2 + 3*i], prev[3 + 3*i]
+            block[1 + 3*i] = np.add.reduceat(mean * weights, starts) / new_weights
+            block[2 + 3*i] = np.minimum.reduceat(low, starts)
+            block[3 + 3*i] = np.maximum.reduceat(high, starts)
+        levels.append(block)
+        weights = new_weights
+    return levels
+
+def write_pyramid(path, time_name, time, columns, factor=4):
+    """
+    Build the pyramid and store it in one binary file.
+    :param path: output file location
+    :param time_name: name of the time column (e.g. `Time (min)`)
+    :param time: 1D array of the time values (ascending)
+    :param columns: dict of column name -> 1D array with the same length as `time`
+    :param factor: reduction factor between two consecutive levels
+    """
+    levels = build_pyramid(time, columns, factor=factor)
+    header = {'factor': factor, 'time': time_name, 'columns': list(columns), 'levels': []}
+    offset = 0 # relative to the start of the data blocks
+    for level in levels:
+        header['levels'].append({'points': level.shape[1], 'offset': offset})
+        offset += level.nbytes
+    header = json.dumps(header).encode('utf-8')
+    # Pad the header so that the data blocks start at a multiple of 8 bytes
+    header += b' ' * (-(len(PYRAMID_MAGIC) + 4 + len(header)) % 8)
+    with open(path, 'wb') as f:
+        f.write(PYRAMID_MAGIC)
+        f.write(np.array([len(header)], dtype='<u4').tobytes())
+        f.write(header)
+        for level in levels:
+            f.write(level.astype('<f8').tobytes())
+
+def read_pyramid(path, t_start=None, t_end=None, max_points=1000):
+    """
+    Read a time window from the pyramid file at the finest level that fits in the point budget.
+    Only the requested window of the selected level is read from the disk (memory mapping).
+    Only the buckets whose data points all lie in [t_start, t_end] are returned, so no data outside the window is included.
+    If even the coarsest level has more than `max_points` buckets in the window, the coarsest level is returned anyway.
+    :param path: pyramid file location
+    :param t_start: start of the time window (None: start of the run)
+    :param t_end: end of the time window (None: end of the run)
+    :param max_points: point budget (at least 1)
+    :return: DataFrame with the time column and the mean, min, and max of each stored column
+    """
+    if max_points < 1:
+        raise ValueError('The point budget (max_points) must be at least 1.')
+    with open(path, 'rb') as f:
+        if f.read(len(PYRAMID_MAGIC)) != PYRAMID_MAGIC:
+            raise ValueError('The file is not an Autogasuptake pyramid file: ' + str(path))
+        header_len = int(np.frombuffer(f.read(4), dtype='<u4')[0])
+        header = json.loads(f.read(header_len).decode('utf-8'))
+    data_start = len(PYRAMID_MAGIC) + 4 + header_len
+    n_columns = len(header['columns'])
+
+    # The window as indices of the full-resolution data points ([first, last) in level 0)
+    n_points = header['levels'][0]['points']
+    time = np.memmap(path, dtype='<f8', mode='r', offset=data_start, shape=(n_points,))
+    first = 0 if t_start is None else int(np.searchsorted(time, t_start, side='left'))
+    last = n_points if t_end is None else int(np.searchsorted(time, t_end, side='right'))
+
+    # Levels are ordered from the finest to the coarsest; the coarsest one is used if none fits the budget
+    for k, level in enumerate(header['levels']):
+        n_rows = 1 + n_columns if k == 0 else 1 + 3 * n_columns
+        block = np.memmap(path, dtype='<f8', mode='r', offset=data_start + level['offset'], shape=(n_rows, level['points']))
+        # Bucket j of level k holds the data points [j * factor**k, (j + 1) * factor**k) (the last bucket may be shorter)
+        size = header['factor'] ** k
+        lo = -(-first // size)
+        hi = level['points'] if last == n_points else last // size
+        hi = max(hi, lo)
+        if hi - lo <= max_points:
+            break
+
+    out = pd.DataFrame({header['time']: np.array(block[0, lo:hi])})
+    for i, name in enumerate(header['columns']):
+        if k == 0:
+            # Full-resolution data: the mean, min, and max of a single point are the point itself
+            values = np.array(block[1 + i, lo:hi])
+            out[name] = values
+            out[name + ' (min)'] = values
+            out[name + ' (max)'] = values
+        else:
+            out[name] = np.array(block[1 + 3*i, lo:hi])
+            out[name + ' (min)'] = np.array(block[2 + 3*i, lo:hi])
+            out[name + ' (max)'] = np.array(block[3 + 3*i, lo:hi])
+    return out
@@ -0,0 +1,268 @@
+import os
+import numpy as np
+import pandas as pd
+
+# Reader for the native LabVIEW TDMS files (no text export needed).
+# Only the lead-in and metadata of each segment are parsed; the raw channel data is memory-mapped into NumPy arrays.
+# Supported: numeric and timestamp raw data (little/big-endian, interleaved or not) over any number of segments. String channels are skipped. Not supported: DAQmx raw data.
+# Reference: https://www.ni.com/en/support/documentation/supplemental/07/tdms-file-format-internal-structure.html
+TDMS_TAG = b'TDSm'
+TDMS_VERSION = 4713
+TDMS_TOC_METADATA = 1 << 1
+TDMS_TOC_NEW_OBJ_LIST = 1 << 2
+TDMS_TOC_RAW_DATA = 1 << 3
+TDMS_TOC_INTERLEAVED = 1 << 5
+TDMS_TOC_BIG_ENDIAN = 1 << 6
+TDMS_NO_DATA = 0xFFFFFFFF
+TDMS_SAME_INDEX = 0x00000000
+
+# TDMS data type code -> NumPy type
+TDMS_DTYPES = {1: 'i1', 2: 'i2', 3: 'i4', 4: 'i8', 5: 'u1', 6: 'u2', 7: 'u4', 8: 'u8', 9: 'f4', 10: 'f8',
+               0x19: 'f4', 0x1A: 'f8', 0x21: 'u1'}
+TDMS_STRING = 0x20
+TDMS_TIMESTAMP = 0x44
+
+def _tdms_dtype(type_code, endian):
+    # NumPy type of the raw data (None for strings, which have no fixed size)
+    # Timestamps are 16 bytes: fractions of a second (uint64) and seconds since 1904-01-01 (int64); big-endian files store the seconds first
+    if type_code == TDMS_TIMESTAMP:
+        if endian == '>':
+            return np.dtype([('seconds', '>i8'), ('fractions', '>u8')])
+        return np.dtype([('fractions', '<u8'), ('seconds', '<i8')])
+    if type_code == TDMS_STRING:
+        return None
+    return np.dtype(endian + TDMS_DTYPES[type_code])
+
+class _TdmsBuffer:
+    # Sequential reader of the metadata bytes of one segment
+    def __init__(self, data, endian):
+        self.data = data
+        self.pos = 0
+        self.endian = endian
+
+    def read(self, dtype):
+        dtype = np.dtype(dtype).newbyteorder(self.endian)
+        value = np.frombuffer(self.data, dtype=dtype, count=1, offset=self.pos)[0]
+        self.pos += dtype.itemsize
+        return value.item()
+
+    def read_string(self):
+        length = self.read('u4')
+        if self.pos + length > len(self.data):
+            raise ValueError('A string in the TDMS metadata runs past the end of the metadata.')
+        value = self.data[self.pos:self.pos+length].decode('utf-8')
+        self.pos += length
+        return value
+
+    def read_value(self, type_code):
+        if type_code == TDMS_STRING:
+            return self.read_string()
+        if type_code == TDMS_TIMESTAMP:
+            if self.endian == '>':
+                seconds = self.read('i8')
+                fractions = self.read('u8')
+            else:
+                fractions = self.read('u8')
+                seconds = self.read('i8')
+            return seconds + fractions / 2**64
+        if type_code == 0x21:
+            return bool(self.read('u1'))
+        if type_code in TDMS_DTYPES:
+            return self.read(TDMS_DTYPES[type_code])
+        raise ValueError('Unsupported TDMS property data type: ' + hex(type_code))
+
+def _tdms_path_parts(path):
+    # "/'Group'/'Channel'" -> ['Group', 'Channel'] (a quote in a name is written as two quotes)
+    parts = []
+    i = 0
+    while i < len(path) - 1:
+        i += 2 # skip "/'"
+        name = ''
+        while True:
+            j = path.index("'", i)
+            name += path[i:j]
+            if path[j+1:j+2] == "'":
+                name += "'"
+                i = j + 2
+            else:
+                i = j + 1
+                break
+        parts.append(name)
+    return parts
+
+def _tdms_path(*parts):
+    return '/' + '/'.join("'" + part.replace("'", "''") + "'" for part in parts) if parts else '/'
+
+def read_tdms(path):
+    """
+    Read all channels of a TDMS file.
+    :param path: TDMS file location
+    :return: dict of channel name -> 1D array (memory-mapped if the data is contiguous in the file), dict of channel name -> dict of properties
+    Timestamp channels are structured arrays with the `seconds` (since 1904-01-01) and `fractions` (of 2**-64 s) fields. String channels are skipped.
+    Raises ValueError if the file is malformed, truncated, or not supported (also if two groups have a channel with the same name).
+    """
+    try:
+        return _read_tdms(path)
+    except (IndexError, KeyError, TypeError, AttributeError, OverflowError) as e:
+        raise ValueError('The TDMS file could not be read (it may be corrupted): ' + str(path) + ' (' + repr(e) + ')') from e
+
+def _read_tdms(path):
+    file_size = os.path.getsize(path)
+    objects = {}   # object path -> {'dtype', 'count', 'properties'}
+    active = []    # object paths that have raw data in the current segment (in order)
+    pieces = {}    # object path -> list of (offset, dtype, count, stride, field offset within the record)
+
+    with open(path, 'rb') as f:
+        segment_start = 0
+        while segment_start + 28 <= file_size:
+            f.seek(segment_start)
+            lead_in = f.read(28)
+            if lead_in[:4] != TDMS_TAG:
+                raise ValueError('The file is not a TDMS file (or it is corrupted): ' + str(path))
+            # The ToC mask is always little-endian; the rest of the segment follows the big-endian flag
+            toc = int(np.frombuffer(lead_in, dtype='<u4', count=1, offset=4)[0])
+            endian = '>' if toc & TDMS_TOC_BIG_ENDIAN else '<'
+            next_offset, raw_offset = np.frombuffer(lead_in, dtype=endian + 'u8', count=2, offset=12)
+            data_start = segment_start + 28 + int(raw_offset)
+            if data_start > file_size:
+                raise ValueError('The TDMS file is truncated (or the segment metadata is corrupted): ' + str(path))
+            # An unfinished segment (e.g. LabVIEW crashed during the acquisition) runs until the end of the file
+            segment_end = file_size if next_offset == 0xFFFFFFFFFFFFFFFF else min(segment_start + 28 + int(next_offset), file_size)
+
+            if toc & TDMS_TOC_NEW_OBJ_LIST:
+                active = []
+            if toc & TDMS_TOC_METADATA:
+                meta = _TdmsBuffer(f.read(int(raw_offset)), endian)
+                for _ in range(meta.read('u4')):
+                    obj_path = meta.read_string()
+                    obj = objects.setdefault(obj_path, {'type_code': None, 'count': 0, 'size': 0, 'properties': {}})
+                    index = meta.read('u4')
+                    if index == TDMS_NO_DATA:
+                        if obj_path in active:
+                            active.remove(obj_path)
+                    elif index == TDMS_SAME_INDEX:
+                        if obj['type_code'] is None:
+                            raise ValueError('The object ' + obj_path + ' reuses a raw data index that was never written.')
+                        if obj_path not in active:
+                            active.append(obj_path)
+                    elif index in (0x69120000, 0x69130000):
+                        raise ValueError('DAQmx raw data is not supported: ' + obj_path)
+                    else:
+                        index_start = meta.pos - 4
+                        type_code = meta.read('u4')
+                        meta.read('u4') # array dimension (always 1)
+                        obj['count'] = meta.read('u8')
+                        if type_code == TDMS_STRING:
+                            obj['size'] = meta.read('u8') # total size of the offsets and the characters
+                        elif type_code in TDMS_DTYPES or type_code == TDMS_TIMESTAMP:
+                            obj['size'] = obj['count'] * _tdms_dtype(type_code, endian).itemsize
+                        else:
+                            raise ValueError('Unsupported TDMS raw data type ' + hex(type_code) + ': ' + obj_path)
+                        obj['type_code'] = type_code
+                        meta.pos = index_start + index
+                        if obj_path not in active:
+                            active.append(obj_path)
+                    for _ in range(meta.read('u4')):
+                        name = meta.read_string()
+                        obj['properties'][name] = meta.read_value(meta.read('u4'))
+
+            if toc & TDMS_TOC_RAW_DATA and active:
+                channels = [(obj_path, _tdms_dtype(objects[obj_path]['type_code'], endian), objects[obj_path]['count'], objects[obj_path]['size'])
+                            for obj_path in active]
+                chunk_size = sum(size for _, _, _, size in channels)
+                n_chunks = (segment_end - data_start) // chunk_size if chunk_size > 0 else 0
+                if toc & TDMS_TOC_INTERLEAVED:
+                    # One record per sample that holds one value of each channel
+                    if any(dtype is None for _, dtype, _, _ in channels):
+                        raise ValueError('Interleaved string raw data is not valid TDMS data: ' + str(path))
+                    record = sum(dtype.itemsize for _, dtype, _, _ in channels)
+                    field = 0
+                    for obj_path, dtype, count, _ in channels:
+                        pieces.setdefault(obj_path, []).append((data_start, dtype, count * n_chunks, record, field))
+                        field += dtype.itemsize
+                else:
+                    offset = data_start
+                    for chunk in range(n_chunks):
+                        for obj_path, dtype, count, size in channels:
+                            # String channels are only skipped over (by their size)
+                            if dtype is not None:
+                                pieces.setdefault(obj_path, []).append((offset, dtype, count, dtype.itemsize, 0))
+                            offset += size
+
+            segment_start = segment_end if next_offset != 0xFFFFFFFFFFFFFFFF else file_size
+    if file_size == 0 or segment_start != file_size:
+        raise ValueError('The TDMS file is empty or truncated: ' + str(path))
+
+    # The whole file is memory-mapped once; every piece of channel data is a view of this map
+    # (files with many segments would otherwise need one open file descriptor per piece)
+    mapped = np.memmap(path, dtype='u1', mode='r')
+    data = {}
+    properties = {}
+    for obj_path, obj in objects.items():
+        parts = _tdms_path_parts(obj_path)
+        if len(parts) != 2:
+            continue # root and group objects have no raw data
+        if obj['type_code'] == TDMS_STRING:
+            continue
+        if parts[1] in data:
+            raise ValueError('There are several channels named ' + parts[1] + ' (in different groups) in the TDMS file: ' + str(path))
+        arrays = []
+        # Merge the pieces that follow each other in the file so that a contiguous channel stays a single view
+        merged = []
+        for offset, dtype, count, stride, field in pieces.get(obj_path, []):
+            if merged and stride == dtype.itemsize and merged[-1][3] == stride and merged[-1][1] == dtype \
+                    and merged[-1][0] + merged[-1][2] * stride == offset:
+                merged[-1] = (merged[-1][0], dtype, merged[-1][2] + count, stride, 0)
+            else:
+                merged.append((offset, dtype, count, stride, field))
+        for offset, dtype, count, stride, field in merged:
+            if count == 0:
+                continue
+            if offset + field + (count - 1) * stride + dtype.itemsize > file_size:
+                raise ValueError('The raw data of ' + obj_path + ' runs past the end of the TDMS file.')
+            if stride == dtype.itemsize:
+                arrays.append(mapped[offset:offset + count * stride].view(dtype))
+            else:
+                arrays.append(np.ndarray(shape=(count,), dtype=dtype, buffer=mapped, offset=offset + field, strides=(stride,)))
+        if len(arrays) == 1:
+            data[parts[1]] = arrays[0]
+        elif arrays:
+            data[parts[1]] = np.concatenate(arrays)
+        else:
+            data[parts[1]] = np.empty(0, dtype=_tdms_dtype(obj['type_code'], '<') if obj['type_code'] is not None else np.float64)
+        properties[parts[1]] = obj['properties']
+    return data, properties
+
+def load_tdms(path, pressure_channel=None, volume_channel=None):
+    """
+    Load the pressure & cylinder volume channels of a TDMS file as the raw data table of the program.
+    :param path: TDMS file location
+    :param pressure_channel: name of the pressure (psi) channel (None: the channel whose name contains `pressure`)
+    :param volume_channel: name of the cylinder volume (mL) channel (None: the channel whose name contains `volume`)
+    :return: DataFrame with the `Pressure (psi)` & `Cylinder volume (mL)` columns, sample interval (in ms; None if it is not stored in the file)
+    If neither channel is given or found by name and the file has exactly two channels, they are taken by position (pressure, volume).
+    """
+    data, properties = read_tdms(path)
+    names = list(data)
+    if pressure_channel is None:
+        pressure_channel = next((name for name in names if 'pressure' in name.lower() and name != volume_channel), None)
+    if volume_channel is None:
+        volume_channel = next((name for name in names if 'volume' in name.lower() and name != pressure_channel), None)
+    if pressure_channel is None and volume_channel is None and len(names) == 2:
+        pressure_channel, volume_channel = names
+    if pressure_channel is None or volume_channel is None:
+        raise ValueError('The pressure and volume channels could not be identified. Please set `pressure-channel` and `volume-channel` in the `settings.txt` file. Available channels: ' + ', '.join(names))
+    if pressure_channel == volume_channel:
+        raise ValueError('The same channel (' + pressure_channel + ') was selected for the pressure and the volume. Available channels: ' + ', '.join(names))
+    for channel in (pressure_channel, volume_channel):
+        if channel not in data:
+            raise ValueError('There is no channel named ' + str(channel) + ' in the TDMS file. Available channels: ' + ', '.join(names))
+
+    n_values = min(len(data[pressure_channel]), len(data[volume_channel]))
+    df = pd.DataFrame({'Pressure (psi)': np.asarray(data[pressure_channel][:n_values], dtype=np.float64),
+                       'Cylinder volume (mL)': np.asarray(data[volume_channel][:n_values], dtype=np.float64)})
+
+    # LabVIEW stores the sample interval of a waveform channel (in s) in the `wf_increment` property
+    increment = properties[pressure_channel].get('wf_increment', properties[volume_channel].get('wf_increment'))
+    sample_interval = float(increment) * 1000 if increment else None
+    return df, sample_interval
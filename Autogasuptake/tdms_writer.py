@@ -0,0 +1,70 @@
+import numpy as np
+from Autogasuptake.tdms import TDMS_TAG, TDMS_VERSION, TDMS_TOC_METADATA, TDMS_TOC_NEW_OBJ_LIST, TDMS_TOC_RAW_DATA, TDMS_NO_DATA, TDMS_STRING, _tdms_path
+
+# Minimal TDMS writer for making example & test files without a LabVIEW installation (the program itself only reads TDMS files).
+
+def write_tdms(path, channels, group='Untitled', properties=None, segment_size=None):
+    """
+    Write channels into a TDMS file (float64, little-endian, not interleaved).
+    Useful for making example files without a LabVIEW installation.
+    :param path: output file location
+    :param channels: dict of channel name -> 1D array
+    :param group: name of the group that holds the channels
+    :param properties: dict of channel name -> dict of properties (str, int, float, or bool values; e.g. {'wf_increment': 60.0})
+    :param segment_size: number of values per channel in each segment (None: one segment)
+    """
+    properties = properties or {}
+    channels = {name: np.asarray(values, dtype='<f8') for name, values in channels.items()}
+    n_values = max([len(values) for values in channels.values()] + [0])
+    segment_size = segment_size or max(n_values, 1)
+
+    def string(value):
+        value = value.encode('utf-8')
+        return np.array([len(value)], dtype='<u4').tobytes() + value
+
+    def prop(name, value):
+        if isinstance(value, str):
+            return string(name) + np.array([TDMS_STRING], dtype='<u4').tobytes() + string(value)
+        if isinstance(value, (bool, np.bool_)):
+            return string(name) + np.array([0x21], dtype='<u4').tobytes() + np.array([value], dtype='u1').tobytes()
+        if isinstance(value, (int, np.integer)):
+            return string(name) + np.array([4], dtype='<u4').tobytes() + np.array([value], dtype='<i8').tobytes()
+        return string(name) + np.array([10], dtype='<u4').tobytes() + np.array([value], dtype='<f8').tobytes()
+
+    with open(path, 'wb') as f:
+        previous_counts = None
+        for start in range(0, max(n_values, 1), segment_size):
+            counts = [len(values[start:start+segment_size]) for values in channels.values()]
+            raw = b''.join(values[start:start+segment_size].tobytes() for values in channels.values())
+            meta = b''
+            toc = TDMS_TOC_RAW_DATA
+            if previous_counts is None:
+                # First segment: every object with all of its properties
+                toc |= TDMS_TOC_METADATA | TDMS_TOC_NEW_OBJ_LIST
+                objects = [string('/') + np.array([TDMS_NO_DATA], dtype='<u4').tobytes() + np.array([0], dtype='<u4').tobytes(),
+                           string(_tdms_path(group)) + np.array([TDMS_NO_DATA], dtype='<u4').tobytes() + np.array([0], dtype='<u4').tobytes()]
+            elif counts != previous_counts:
+                # The number of values changed; the raw data index is written again
+                toc |= TDMS_TOC_METADATA
+                objects = []
+            else:
+                # Same layout as the previous segment: no metadata at all
+                objects = None
+            if objects is not None:
+                for (name, values), count in zip(channels.items(), counts):
+                    entry = string(_tdms_path(group, name))
+                    if count == 0:
+                        entry += np.array([TDMS_NO_DATA], dtype='<u4').tobytes()
+                    else:
+                        entry += np.array([20, 10, 1], dtype='<u4').tobytes() + np.array([count], dtype='<u8').tobytes()
+                    channel_props = properties.get(name, {}) if previous_counts is None else {}
+                    entry += np.array([len(channel_props)], dtype='<u4').tobytes()
+                    entry += b''.join(prop(key, value) for key, value in channel_props.items())
+                    objects.append(entry)
+                meta = np.array([len(objects)], dtype='<u4').tobytes() + b''.join(objects)
+            f.write(TDMS_TAG)
+            f.write(np.array([toc, TDMS_VERSION], dtype='<u4').tobytes())
+            f.write(np.array([len(meta) + len(raw), len(meta)], dtype='<u8').tobytes())
+            f.write(meta)
+            f.write(raw)
+            previous_counts = counts
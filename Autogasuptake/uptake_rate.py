@@ -0,0 +1,91 @@
+import numpy as np
+from scipy.signal import savgol_coeffs
+
+# Savitzky-Golay smoothing and first derivative (formation rate) on the uniform `frequency` grid.
+# The input can be fed chunk by chunk; the last `window - 1` samples are carried over to the next chunk so that the output is the same as for the whole series.
+# Rows removed from the series leave gaps in the time axis; `uniform_grid` interpolates them back so that the filter sees a uniform grid.
+# The first and last `window // 2` samples are evaluated from the polynomial fitted on the first/last window (same as `scipy.signal.savgol_filter(mode='interp')`).
+
+class SavgolStream:
+    def __init__(self, window, polyorder, delta):
+        """
+        :param window: length of the filter window (odd number of data points)
+        :param polyorder: order of the fitted polynomial (smaller than `window`)
+        :param delta: spacing of the samples in the time unit of the derivative
+        """
+        if window % 2 == 0 or window < 1:
+            raise ValueError('The smoothing window must be a positive odd number.')
+        if polyorder >= window:
+            raise ValueError('The smoothing order must be smaller than the smoothing window.')
+        self.window = window
+        self.polyorder = polyorder
+        self.delta = delta
+        self.half = window // 2
+        self.smooth_coeffs = savgol_coeffs(window, polyorder, deriv=0, use='conv')
+        self.rate_coeffs = savgol_coeffs(window, polyorder, deriv=1, delta=delta, use='conv')
+        self.tail = np.empty(0) # carried-over window state
+        self.started = False
+
+    def _edge(self, values, positions):
+        # Evaluate the polynomial fitted on one full window at the given positions of that window
+        poly = np.polyfit(np.arange(self.window), values, self.polyorder)
+        return np.polyval(poly, positions), np.polyval(np.polyder(poly), positions) / self.delta
+
+    def update(self, chunk):
+        """
+        Feed the next chunk of the series.
+        :param chunk: 1D array of new samples
+        :return: smoothed values and rates of the samples that are now complete
+        """
+        data = np.concatenate([self.tail, np.asarray(chunk, dtype=np.float64)])
+        if len(data) < self.window:
+            self.tail = data
+            return np.empty(0), np.empty(0)
+        smooth = np.convolve(data, self.smooth_coeffs, mode='valid')
+        rate = np.convolve(data, self.rate_coeffs, mode='valid')
+        if not self.started:
+            edge_smooth, edge_rate = self._edge(data[:self.window], np.arange(self.half))
+            smooth = np.concatenate([edge_smooth, smooth])
+            rate = np.concatenate([edge_rate, rate])
+            self.started = True
+        self.last_window = data[-self.window:]
+        self.tail = data[-(self.window - 1):] if self.window > 1 else data[:0]
+        return smooth, rate
+
+    def finish(self):
+        """
+        End the stream.
+        :return: smoothed values and rates of the last `window // 2` samples
+        """
+        if not self.started:
+            raise ValueError('The series is shorter than the smoothing window.')
+        return self._edge(self.last_window, np.arange(self.half + 1, self.window))
+
+def savgol_uptake(values, delta, window=11, polyorder=2, chunk_size=4096):
+    """
+    Smoothed series and its first derivative, computed chunk by chunk.
+    :param values: 1D array on a uniform time grid
+    :param delta: spacing of the samples (in the time unit of the derivative)
+    :param window: length of the filter window (odd number of data points)
+    :param polyorder: order of the fitted polynomial
+    :param chunk_size: number of samples fed to the stream at once
+    :return: smoothed values, first derivative
+    """
+    values = np.asarray(values, dtype=np.float64)
+    stream = SavgolStream(window, polyorder, delta)
+    parts = [stream.update(values[i:i+chunk_size]) for i in range(0, len(values), chunk_size)]
+    parts.append(stream.finish())
+    return np.concatenate([part[0] for part in parts]), np.concatenate([part[1] for part in parts])
+
+def uniform_grid(time, values, delta):
+    """
+    Put a series with gaps (removed rows) back on the uniform time grid.
+    :param time: 1D array of the time values (ascending, multiples of `delta` from the first value)
+    :param values: 1D array with the same length as `time`
+    :param delta: spacing of the uniform grid (in the time unit of `time`)
+    :return: values on the uniform grid (gaps linearly interpolated), grid position of each input row
+    """
+    time = np.asarray(time, dtype=np.float64)
+    grid_index = np.rint((time - time[0]) / delta).astype(int)
+    grid_values = np.interp(np.arange(grid_index[-1] + 1), grid_index, np.asarray(values, dtype=np.float64))
+    return grid_values, grid_index
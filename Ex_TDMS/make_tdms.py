@@ -0,0 +1,9 @@
+# Makes the example TDMS file of this folder from the raw csv file of `Ex_CO2` (no LabVIEW installation needed).
+# Run it from the repository root with the package installed (`pip install .`): python Ex_TDMS/make_tdms.py
+import pandas as pd
+from Autogasuptake.tdms_writer import write_tdms
+
+raw = pd.read_csv('Ex_CO2/230131_pureCO2+uptake_t4.csv', header=None, sep=' ')
+write_tdms('Ex_TDMS/230131_pureCO2+uptake_t4.tdms', {'Pressure': raw[0].to_numpy(), 'Volume': raw[1].to_numpy()}, group='ISCO pump',
+           properties={'Pressure': {'unit_string': 'psi', 'wf_increment': 60.0}, 'Volume': {'unit_string': 'mL', 'wf_increment': 60.0}},
+           segment_size=100)
@@ -0,0 +1,84 @@
+import numpy as np
+import pytest
+
+from Autogasuptake.pyramid import build_pyramid, write_pyramid, read_pyramid
+
+# 1003 points with factor 4: the levels hold 1003, 251, 63, and 16 points, and the last bucket of each reduced level is partial
+N_POINTS = 1003
+FACTOR = 4
+
+
+def _series():
+    rng = np.random.default_rng(0)
+    time = np.arange(N_POINTS) * 0.5
+    return time, {'Uptake': rng.normal(size=N_POINTS), 'Pressure': rng.normal(500, 5, size=N_POINTS)}
+
+
+def _brute_force(values, size, lo, hi):
+    # Mean, min, and max of the buckets [lo, hi) with `size` raw data points each
+    buckets = [values[j * size:(j + 1) * size] for j in range(lo, hi)]
+    return (np.array([b.mean() for b in buckets]), np.array([b.min() for b in buckets]),
+            np.array([b.max() for b in buckets]))
+
+
+@pytest.fixture
+def pyramid(tmp_path):
+    path = tmp_path / 'run_PYRAMID.bin'
+    time, columns = _series()
+    write_pyramid(path, 'Time (min)', time, columns, factor=FACTOR)
+    return path
+
+
+def test_levels():
+    time, columns = _series()
+    levels = build_pyramid(time, columns, factor=FACTOR)
+    assert [level.shape for level in levels] == [(3, 1003), (7, 251), (7, 63), (7, 16)]
+
+
+@pytest.mark.parametrize('max_points, k', [(1003, 0), (1002, 1), (251, 1), (250, 2), (63, 2), (62, 3), (16, 3), (1, 3)])
+def test_buckets_against_brute_force(pyramid, max_points, k):
+    # The finest level that fits in the budget; the coarsest one if none fits
+    time, columns = _series()
+    size = FACTOR ** k
+    n_buckets = -(-N_POINTS // size)
+    out = read_pyramid(pyramid, max_points=max_points)
+    assert len(out) == n_buckets
+    np.testing.assert_allclose(out['Time (min)'], _brute_force(time, size, 0, n_buckets)[0])
+    for name, values in columns.items():
+        mean, low, high = _brute_force(values, size, 0, n_buckets)
+        np.testing.assert_allclose(out[name], mean)
+        np.testing.assert_array_equal(out[name + ' (min)'], low)
+        np.testing.assert_array_equal(out[name + ' (max)'], high)
+
+
+@pytest.mark.parametrize('max_points, k, lo, hi', [(381, 0, 20, 401), (380, 1, 5, 100), (95, 1, 5, 100), (94, 2, 2, 25),
+                                                   (23, 2, 2, 25), (10, 3, 1, 6)])
+def test_window(pyramid, max_points, k, lo, hi):
+    # [10, 200] is the data points [20, 401); only the buckets that lie completely in the window are returned
+    time, columns = _series()
+    size = FACTOR ** k
+    out = read_pyramid(pyramid, t_start=10, t_end=200, max_points=max_points)
+    assert len(out) == hi - lo
+    np.testing.assert_allclose(out['Time (min)'], _brute_force(time, size, lo, hi)[0])
+    for name, values in columns.items():
+        mean, low, high = _brute_force(values, size, lo, hi)
+        np.testing.assert_allclose(out[name], mean)
+        np.testing.assert_array_equal(out[name + ' (min)'], low)
+        np.testing.assert_array_equal(out[name + ' (max)'], high)
+
+
+def test_window_smaller_than_a_bucket(pyramid):
+    out = read_pyramid(pyramid, t_start=10, t_end=11, max_points=1)
+    assert len(out) == 0
+
+
+def test_max_points(pyramid):
+    with pytest.raises(ValueError, match='max_points'):
+        read_pyramid(pyramid, max_points=0)
+
+
+def test_bad_magic(tmp_path):
+    path = tmp_path / 'run.bin'
+    path.write_bytes(b'NOTAPYRAMID' + bytes(64))
+    with pytest.raises(ValueError, match='not an Autogasuptake pyramid file'):
+        read_pyramid(path)
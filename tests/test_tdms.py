@@ -0,0 +1,202 @@
+import numpy as np
+import pytest
+
+from Autogasuptake.tdms import (read_tdms, load_tdms, TDMS_TAG, TDMS_VERSION, TDMS_TOC_METADATA, TDMS_TOC_NEW_OBJ_LIST,
+                                TDMS_TOC_RAW_DATA, TDMS_TOC_INTERLEAVED, TDMS_TOC_BIG_ENDIAN)
+from Autogasuptake.tdms_writer import write_tdms
+
+
+def _string(value, endian):
+    value = value.encode('utf-8')
+    return np.array([len(value)], dtype=endian + 'u4').tobytes() + value
+
+
+def _interleaved_segment(endian):
+    # One segment with a float64 and an int16 channel, written sample by sample
+    x = np.arange(5, dtype=np.float64)
+    y = np.arange(5, dtype=np.int16) * 2
+    meta = np.array([2], dtype=endian + 'u4').tobytes()
+    for name, type_code in [('X', 10), ('Y', 2)]:
+        meta += _string("/'g'/'" + name + "'", endian)
+        meta += np.array([20, type_code, 1], dtype=endian + 'u4').tobytes() + np.array([5], dtype=endian + 'u8').tobytes()
+        meta += np.array([0], dtype=endian + 'u4').tobytes()
+    records = np.zeros(5, dtype=[('x', endian + 'f8'), ('y', endian + 'i2')])
+    records['x'] = x
+    records['y'] = y
+    raw = records.tobytes()
+    toc = TDMS_TOC_METADATA | TDMS_TOC_NEW_OBJ_LIST | TDMS_TOC_RAW_DATA | TDMS_TOC_INTERLEAVED
+    if endian == '>':
+        toc |= TDMS_TOC_BIG_ENDIAN
+    lead_in = TDMS_TAG + np.array([toc], dtype='<u4').tobytes() + np.array([TDMS_VERSION], dtype=endian + 'u4').tobytes()
+    lead_in += np.array([len(meta) + len(raw), len(meta)], dtype=endian + 'u8').tobytes()
+    return lead_in + meta + raw, x, y
+
+
+@pytest.mark.parametrize('segment_size', [None, 1, 300, 999])
+def test_round_trip(tmp_path, segment_size):
+    # 999 values per segment: the last segment has another number of values, so its raw data index is written again
+    path = tmp_path / 'run.tdms'
+    pressure = np.linspace(500, 400, 1000)
+    volume = np.linspace(500, 100, 1000)
+    properties = {'Pressure': {'wf_increment': 60.0, 'unit_string': 'psi', 'count': 3, 'waveform': True}}
+    write_tdms(path, {'Pressure': pressure, "Cylinder 'Volume'": volume}, group="ISCO 'pump'", properties=properties,
+               segment_size=segment_size)
+    data, props = read_tdms(path)
+    assert list(data) == ['Pressure', "Cylinder 'Volume'"]
+    np.testing.assert_array_equal(data['Pressure'], pressure)
+    np.testing.assert_array_equal(data["Cylinder 'Volume'"], volume)
+    assert props['Pressure'] == properties['Pressure']
+    if segment_size is None:
+        assert isinstance(data['Pressure'], np.memmap)
+
+
+def test_channel_without_data_in_a_segment(tmp_path):
+    # The shorter channel has no values in the second segment (TDMS_NO_DATA raw data index)
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Pressure': np.arange(10.0), 'Volume': np.arange(4.0)}, segment_size=5)
+    data, _ = read_tdms(path)
+    np.testing.assert_array_equal(data['Pressure'], np.arange(10.0))
+    np.testing.assert_array_equal(data['Volume'], np.arange(4.0))
+
+
+@pytest.mark.parametrize('endian', ['<', '>'])
+def test_interleaved(tmp_path, endian):
+    path = tmp_path / 'run.tdms'
+    content, x, y = _interleaved_segment(endian)
+    path.write_bytes(content)
+    data, _ = read_tdms(path)
+    np.testing.assert_array_equal(data['X'], x)
+    np.testing.assert_array_equal(data['Y'], y)
+
+
+def test_load_tdms_sample_interval(tmp_path):
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Pressure': np.full(6, 507.2), 'Volume': np.linspace(503, 490, 6)},
+               properties={'Pressure': {'wf_increment': 60.0}})
+    df, sample_interval = load_tdms(path)
+    assert list(df.columns) == ['Pressure (psi)', 'Cylinder volume (mL)']
+    np.testing.assert_array_equal(df['Cylinder volume (mL)'], np.linspace(503, 490, 6))
+    assert sample_interval == 60000.0
+
+
+def test_load_tdms_without_sample_interval(tmp_path):
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Pressure': np.arange(3.0), 'Volume': np.arange(3.0)})
+    assert load_tdms(path)[1] is None
+
+
+def test_load_tdms_channel_selection(tmp_path):
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Volume (mL)': np.arange(3.0), 'Pump pressure': np.arange(3.0) + 500})
+    df, _ = load_tdms(path)
+    np.testing.assert_array_equal(df['Pressure (psi)'], np.arange(3.0) + 500)
+
+    # Two channels without matching names: taken by position
+    write_tdms(path, {'A': np.arange(3.0) + 500, 'B': np.arange(3.0)})
+    df, _ = load_tdms(path)
+    np.testing.assert_array_equal(df['Cylinder volume (mL)'], np.arange(3.0))
+
+
+@pytest.mark.parametrize('channels, kwargs', [
+    (['Time', 'Pressure'], {}),
+    (['Time', 'Pressure'], {'volume_channel': 'Pressure'}),
+    (['Time', 'Pressure', 'Temperature'], {}),
+    (['Pressure', 'Volume'], {'pressure_channel': 'Volume', 'volume_channel': 'Volume'}),
+    (['Pressure', 'Volume'], {'volume_channel': 'Flow'}),
+])
+def test_load_tdms_channel_errors(tmp_path, channels, kwargs):
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {name: np.arange(3.0) for name in channels})
+    with pytest.raises(ValueError, match='Available channels'):
+        load_tdms(path, **kwargs)
+
+
+def test_duplicate_channel_names(tmp_path):
+    # The same channel name in two groups: the second segment adds the group `B`
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Pressure': np.arange(3.0)}, group='A')
+    other = tmp_path / 'other.tdms'
+    write_tdms(other, {'Pressure': np.arange(3.0)}, group='B')
+    content = other.read_bytes()
+    # Keep the object list of the first segment (no kTocNewObjList flag in the second one)
+    toc = int(np.frombuffer(content, dtype='<u4', count=1, offset=4)[0]) & ~TDMS_TOC_NEW_OBJ_LIST
+    path.write_bytes(path.read_bytes() + content[:4] + np.array([toc], dtype='<u4').tobytes() + content[8:])
+    with pytest.raises(ValueError, match='several channels'):
+        read_tdms(path)
+
+
+@pytest.mark.parametrize('cut', [10, 40, 60])
+def test_truncated_file(tmp_path, cut):
+    path = tmp_path / 'run.tdms'
+    write_tdms(path, {'Pressure': np.arange(3.0), 'Volume': np.arange(3.0)}, properties={'Pressure': {'unit_string': 'psi'}})
+    path.write_bytes(path.read_bytes()[:cut])
+    with pytest.raises(ValueError):
+        read_tdms(path)
+
+
+def test_same_index_without_previous_index(tmp_path):
+    path = tmp_path / 'run.tdms'
+    meta = np.array([1], dtype='<u4').tobytes() + _string("/'g'/'X'", '<') + np.array([0, 0], dtype='<u4').tobytes()
+    raw = np.arange(3.0).tobytes()
+    toc = TDMS_TOC_METADATA | TDMS_TOC_NEW_OBJ_LIST | TDMS_TOC_RAW_DATA
+    path.write_bytes(TDMS_TAG + np.array([toc, TDMS_VERSION], dtype='<u4').tobytes()
+                     + np.array([len(meta) + len(raw), len(meta)], dtype='<u8').tobytes() + meta + raw)
+    with pytest.raises(ValueError, match='never written'):
+        read_tdms(path)
+
+
+def test_many_segments(tmp_path):
+    # LabVIEW often writes one segment per write call; the reader must not open the file once per segment
+    path = tmp_path / 'run.tdms'
+    pressure = np.linspace(500, 400, 5000)
+    volume = np.linspace(500, 100, 5000)
+    write_tdms(path, {'Pressure': pressure, 'Volume': volume}, properties={'Pressure': {'wf_increment': 60.0}}, segment_size=1)
+    df, sample_interval = load_tdms(path)
+    np.testing.assert_array_equal(df['Pressure (psi)'], pressure)
+    np.testing.assert_array_equal(df['Cylinder volume (mL)'], volume)
+    assert sample_interval == 60000.0
+
+
+def _segment_with_time_channel(endian):
+    # Non-interleaved segment with a timestamp, a string, and the pressure & volume channels (two chunks of 3 values)
+    seconds = np.array([3786825600, 3786825660, 3786825720], dtype=np.int64)
+    fractions = np.array([0, 2**63, 0], dtype=np.uint64)
+    time = np.zeros(3, dtype=[('seconds', endian + 'i8'), ('fractions', endian + 'u8')] if endian == '>'
+                    else [('fractions', '<u8'), ('seconds', '<i8')])
+    time['seconds'] = seconds
+    time['fractions'] = fractions
+    comments = [b'a', b'bc', b'']
+    comment_raw = np.cumsum([len(c) for c in comments]).astype(endian + 'u4').tobytes() + b''.join(comments)
+    pressure = np.array([507.2, 507.0, 506.8])
+    volume = np.array([503.2, 502.0, 501.1])
+
+    meta = np.array([4], dtype=endian + 'u4').tobytes()
+    meta += _string("/'g'/'Time'", endian) + np.array([20, 0x44, 1], dtype=endian + 'u4').tobytes()
+    meta += np.array([3], dtype=endian + 'u8').tobytes() + np.array([0], dtype=endian + 'u4').tobytes()
+    meta += _string("/'g'/'Comment'", endian) + np.array([28, 0x20, 1], dtype=endian + 'u4').tobytes()
+    meta += np.array([3, len(comment_raw)], dtype=endian + 'u8').tobytes() + np.array([0], dtype=endian + 'u4').tobytes()
+    for name in ['Pressure', 'Volume']:
+        meta += _string("/'g'/'" + name + "'", endian) + np.array([20, 10, 1], dtype=endian + 'u4').tobytes()
+        meta += np.array([3], dtype=endian + 'u8').tobytes() + np.array([0], dtype=endian + 'u4').tobytes()
+    chunk = time.tobytes() + comment_raw + pressure.astype(endian + 'f8').tobytes() + volume.astype(endian + 'f8').tobytes()
+    raw = chunk * 2
+    toc = TDMS_TOC_METADATA | TDMS_TOC_NEW_OBJ_LIST | TDMS_TOC_RAW_DATA
+    if endian == '>':
+        toc |= TDMS_TOC_BIG_ENDIAN
+    lead_in = TDMS_TAG + np.array([toc], dtype='<u4').tobytes() + np.array([TDMS_VERSION], dtype=endian + 'u4').tobytes()
+    lead_in += np.array([len(meta) + len(raw), len(meta)], dtype=endian + 'u8').tobytes()
+    return lead_in + meta + raw, seconds, fractions, pressure, volume
+
+
+@pytest.mark.parametrize('endian', ['<', '>'])
+def test_timestamp_and_string_channels(tmp_path, endian):
+    path = tmp_path / 'run.tdms'
+    content, seconds, fractions, pressure, volume = _segment_with_time_channel(endian)
+    path.write_bytes(content)
+    data, _ = read_tdms(path)
+    assert 'Comment' not in data
+    np.testing.assert_array_equal(data['Time']['seconds'], np.tile(seconds, 2))
+    np.testing.assert_array_equal(data['Time']['fractions'], np.tile(fractions, 2))
+    df, _ = load_tdms(path)
+    np.testing.assert_array_equal(df['Pressure (psi)'], np.tile(pressure, 2))
+    np.testing.assert_array_equal(df['Cylinder volume (mL)'], np.tile(volume, 2))
@@ -0,0 +1,59 @@
+import numpy as np
+import pytest
+from scipy.signal import savgol_filter
+
+from Autogasuptake.uptake_rate import SavgolStream, savgol_uptake, uniform_grid
+
+
+def _uptake():
+    # Gas uptake-like curve with noise, sampled every 5 min
+    rng = np.random.default_rng(0)
+    time = np.arange(500) * 5.0
+    return time, 0.1 * (1 - np.exp(-time / 600)) + rng.normal(0, 1e-3, size=len(time))
+
+
+@pytest.mark.parametrize('chunk_size', [1, 4, 4096])
+@pytest.mark.parametrize('window, polyorder', [(5, 2), (11, 2), (11, 3), (31, 1), (1, 0)])
+def test_against_savgol_filter(chunk_size, window, polyorder):
+    # Chunks of 1 sample, chunks shorter than the window, and the whole series at once give the same result
+    _, values = _uptake()
+    smoothed, rate = savgol_uptake(values, 5.0, window, polyorder, chunk_size=chunk_size)
+    np.testing.assert_allclose(smoothed, savgol_filter(values, window, polyorder, mode='interp'), rtol=0, atol=1e-12)
+    np.testing.assert_allclose(rate, savgol_filter(values, window, polyorder, deriv=1, delta=5.0, mode='interp'),
+                               rtol=0, atol=1e-12)
+
+
+def test_series_as_long_as_the_window():
+    values = np.array([0.0, 1.0, 4.0, 9.0, 16.0])
+    smoothed, rate = savgol_uptake(values, 1.0, 5, 2)
+    np.testing.assert_allclose(smoothed, values, atol=1e-12)
+    np.testing.assert_allclose(rate, 2 * np.arange(5.0), atol=1e-12)
+
+
+def test_finish_short_stream():
+    stream = SavgolStream(11, 2, 1.0)
+    smoothed, rate = stream.update(np.arange(10.0))
+    assert len(smoothed) == len(rate) == 0
+    with pytest.raises(ValueError, match='shorter than the smoothing window'):
+        stream.finish()
+
+
+@pytest.mark.parametrize('window, polyorder', [(4, 2), (0, 0), (5, 5)])
+def test_bad_window(window, polyorder):
+    with pytest.raises(ValueError):
+        SavgolStream(window, polyorder, 1.0)
+
+
+def test_uniform_grid():
+    # Rows 3, 4, and 7 were removed; the time values carry small rounding errors
+    time, values = _uptake()
+    kept = np.setdiff1d(np.arange(len(time)), [3, 4, 7])
+    grid_values, grid_index = uniform_grid(time[kept] + 1e-9, values[kept], 5.0)
+    assert len(grid_values) == len(time)
+    np.testing.assert_array_equal(grid_index, kept)
+    np.testing.assert_array_equal(grid_values[kept], values[kept])
+    np.testing.assert_allclose(grid_values[[3, 4, 7]], np.interp([3, 4, 7], kept, values[kept]))
+
+    # The smoothing filter runs on the grid, then the kept rows are taken back
+    smoothed, rate = savgol_uptake(grid_values, 5.0, 11, 2)
+    np.testing.assert_allclose(rate[grid_index], savgol_filter(grid_values, 11, 2, deriv=1, delta=5.0)[kept], atol=1e-12)